@@ -0,0 +1,270 @@
+"""
+Benchmark and load-test the digest pipeline against a local stub upstream.
+
+    python -m benchmarks stages --entries 500 --content-length 4000
+    python -m benchmarks load --requests 200 --concurrency 20
+    python -m benchmarks startup --budget-ms 1000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable
+
+import httpx
+
+from rss_pipes.digest import (
+    _extract_datetime_entry_pairs,
+    _extract_entry_data,
+    _fetch_feed,
+    _get_base_url,
+    _get_template,
+    _prepare_template_context,
+    _render_feed,
+    _rewrite_relative_urls,
+    digest_feed,
+)
+from rss_pipes.main import app
+from rss_pipes.schedule import Schedule, apply_schedule
+
+from .stub_upstream import serve_feeds
+from .synthetic import FeedSpec, generate_feed
+
+FEED_PATH = "/feed.xml"
+
+# Run in a fresh interpreter so nothing is already imported or cached.
+_STARTUP_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import rss_pipes.main
+imported = time.perf_counter()
+from rss_pipes.digest import _get_template
+_get_template()
+loaded = time.perf_counter()
+sys.stdout.write(json.dumps([imported - start, loaded - imported]))
+"""
+
+
+def _summarize(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[max(0, round(len(ordered) * 0.95) - 1)] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def _time_async(fn: Callable[[], Awaitable[object]], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _time_sync(fn: Callable[[], object], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def run_stages(
+    feed_url: str, schedule: Schedule, repeat: int
+) -> dict[str, dict[str, float]]:
+    """Time each stage of `digest_feed` separately, then end to end."""
+    base_url = _get_base_url(feed_url)
+    assert base_url is not None
+
+    feed, _ = await _fetch_feed(feed_url)
+    items = _extract_datetime_entry_pairs(feed)
+    contents = [_extract_entry_data(entry, None)["content"] for _, entry in items]
+    context = _prepare_template_context(schedule, feed, base_url)
+    # Compile the lazily-loaded template up front, so `render` is steady state
+    _get_template()
+
+    def rewrite_all():
+        for content in contents:
+            _rewrite_relative_urls(content, base_url)
+
+    return {
+        "fetch_feed": _summarize(
+            await _time_async(lambda: _fetch_feed(feed_url), repeat)
+        ),
+        "apply_schedule": _summarize(
+            _time_sync(lambda: apply_schedule(schedule, items), repeat)
+        ),
+        "rewrite_relative_urls": _summarize(_time_sync(rewrite_all, repeat)),
+        "prepare_template_context": _summarize(
+            _time_sync(
+                lambda: _prepare_template_context(schedule, feed, base_url), repeat
+            )
+        ),
+        "render": _summarize(_time_sync(lambda: _render_feed(context), repeat)),
+        "end_to_end": _summarize(
+            await _time_async(lambda: digest_feed(feed_url, schedule), repeat)
+        ),
+    }
+
+
+async def run_load(
+    feed_url: str, schedule_str: str, requests: int, concurrency: int
+) -> dict[str, dict[str, float]]:
+    """Fire concurrent `/digest` requests at the ASGI app in-process."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+    errors = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://rss-pipes"
+    ) as client:
+
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                r = await client.get(
+                    f"/digest/{feed_url}", params={"schedule": schedule_str}
+                )
+                samples.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "latency": _summarize(samples),
+        "throughput": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "errors": errors,
+            "elapsed_s": elapsed,
+            "requests_per_s": requests / elapsed,
+        },
+    }
+
+
+def run_startup(repeat: int, budget_ms: float) -> dict[str, dict[str, float]]:
+    """Measure cold-start cost of the app in fresh interpreters."""
+    process, import_app, load_template = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SNIPPET],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        process.append(time.perf_counter() - start)
+        imported, loaded = json.loads(result.stdout)
+        import_app.append(imported)
+        load_template.append(loaded)
+
+    import_median_ms = statistics.median(import_app) * 1000
+    return {
+        "process": _summarize(process),
+        "import_app": _summarize(import_app),
+        "load_template": _summarize(load_template),
+        "budget": {
+            "import_app_budget_ms": budget_ms,
+            "import_app_median_ms": import_median_ms,
+            "within_budget": import_median_ms <= budget_ms,
+        },
+    }
+
+
+def _format_report(report: dict[str, dict[str, float]]) -> str:
+    lines = []
+    for name, values in report.items():
+        fields = "  ".join(
+            f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in values.items()
+        )
+        lines.append(f"{name:<26} {fields}")
+    return "\n".join(lines)
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("mode", choices=["stages", "load", "startup"])
+    parser.add_argument("--entries", type=int, default=FeedSpec.entries)
+    parser.add_argument("--content-length", type=int, default=FeedSpec.content_length)
+    parser.add_argument(
+        "--relative-url-density", type=float, default=FeedSpec.relative_url_density
+    )
+    parser.add_argument("--date-span-days", type=int, default=FeedSpec.date_span_days)
+    parser.add_argument("--seed", type=int, default=FeedSpec.seed)
+    parser.add_argument("--schedule", default="weekly-sat-10:00")
+    parser.add_argument(
+        "--repeat", type=_positive_int, default=20, help="stages and startup modes only"
+    )
+    parser.add_argument(
+        "--requests", type=_positive_int, default=200, help="load mode only"
+    )
+    parser.add_argument(
+        "--concurrency", type=_positive_int, default=20, help="load mode only"
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=1000.0,
+        help="startup mode only; exit non-zero if importing the app is slower",
+    )
+    parser.add_argument("--json", action="store_true", help="emit a JSON report")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    spec = FeedSpec(
+        entries=args.entries,
+        content_length=args.content_length,
+        relative_url_density=args.relative_url_density,
+        date_span_days=args.date_span_days,
+        seed=args.seed,
+    )
+    schedule = Schedule.validate(args.schedule)
+
+    if args.mode == "startup":
+        report = run_startup(args.repeat, args.budget_ms)
+    else:
+        with serve_feeds({FEED_PATH: generate_feed(spec)}) as upstream_url:
+            feed_url = upstream_url + FEED_PATH
+            if args.mode == "stages":
+                report = asyncio.run(run_stages(feed_url, schedule, args.repeat))
+            else:
+                report = asyncio.run(
+                    run_load(feed_url, args.schedule, args.requests, args.concurrency)
+                )
+
+    if args.json:
+        output = json.dumps({"spec": spec.__dict__, "report": report}, indent=2)
+    else:
+        output = _format_report(report)
+    sys.stdout.write(output + "\n")
+
+    if args.mode == "startup" and not report["budget"]["within_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
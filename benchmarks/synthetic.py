@@ -0,0 +1,81 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+from rss_pipes.digest import dt_isoformat
+
+_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+
+@dataclass(frozen=True)
+class FeedSpec:
+    """Shape of a synthetic Atom feed."""
+
+    entries: int = 200
+    content_length: int = 2000
+    relative_url_density: float = 0.5
+    date_span_days: int = 90
+    seed: int = 0
+
+
+def generate_feed(spec: FeedSpec, base_url: str = "http://example.org") -> str:
+    """
+    Generate a deterministic Atom feed matching the given spec.
+
+    `relative_url_density` is the fraction of links/images inside each entry's
+    content that use a relative URL, exercising `_rewrite_relative_urls`.
+    """
+    rng = random.Random(spec.seed)
+    end = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    span_seconds = spec.date_span_days * 24 * 60 * 60
+
+    entries = []
+    for i in range(spec.entries):
+        published = end - timedelta(seconds=rng.randrange(span_seconds or 1))
+        content = _generate_content(rng, spec, base_url)
+        entries.append(
+            "  <entry>\n"
+            f"    <title>Entry {i}</title>\n"
+            f'    <link href="/posts/{i}"/>\n'
+            f"    <id>urn:rss-pipes-bench:{spec.seed}:{i}</id>\n"
+            f"    <published>{dt_isoformat(published)}</published>\n"
+            f'    <content type="html">{escape(content)}</content>\n'
+            "  </entry>\n"
+        )
+
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        "  <title>Synthetic Feed</title>\n"
+        f'  <link href="{base_url}/"/>\n'
+        f"  <updated>{dt_isoformat(end)}</updated>\n"
+        "  <author><name>Benchmark</name></author>\n"
+        f"  <id>urn:rss-pipes-bench:{spec.seed}</id>\n"
+        f"{''.join(entries)}"
+        "</feed>\n"
+    )
+
+
+def _generate_content(rng: random.Random, spec: FeedSpec, base_url: str) -> str:
+    parts = ["<p>"]
+    length = 0
+    while length < spec.content_length:
+        if rng.random() < 0.1:
+            if rng.random() < spec.relative_url_density:
+                href = f"/assets/{rng.randrange(10_000)}"
+            else:
+                href = f"{base_url}/assets/{rng.randrange(10_000)}"
+            if rng.random() < 0.5:
+                fragment = f'<a href="{href}">link</a>'
+            else:
+                fragment = f'<img src="{href}.png"/>'
+        else:
+            fragment = rng.choice(_WORDS)
+        parts.append(fragment)
+        length += len(fragment) + 1
+    parts.append("</p>")
+    return " ".join(parts)
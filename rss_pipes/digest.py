@@ -1,16 +1,20 @@
+import functools
 import os
 from datetime import datetime
-from typing import NotRequired, TypedDict
+from typing import TYPE_CHECKING, NotRequired, TypedDict
 from urllib.parse import urljoin, urlparse, urlunparse
 
-import feedparser  # type: ignore
 import httpx
-from bs4 import BeautifulSoup
-from bs4.element import Tag
-from jinja2 import Environment, FileSystemLoader
 
+from . import websub
 from .schedule import Schedule, apply_schedule
 
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+# feedparser, BeautifulSoup and Jinja2 are imported on first use rather than
+# at module load, to keep the service's cold start short.
+
 
 class FeedParsingError(ValueError):
     def __init__(self, message):
@@ -48,20 +52,39 @@ def dt_readable_date(dt: datetime) -> str:
     return dt.strftime("%d %b %Y")
 
 
-# Initialize Jinja2 environment
 template_dir = os.path.join(os.path.dirname(__file__), "templates")
-jinja_env = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
-jinja_env.filters["dt_isoformat"] = dt_isoformat
-jinja_env.filters["dt_readable_date"] = dt_readable_date
+
+
+@functools.cache
+def _get_template() -> "Template":
+    """
+    Load and compile the digest template once. Templates ship with the package
+    and never change at runtime, so auto-reload (a stat per lookup) is disabled.
+    """
+    from jinja2 import Environment, FileSystemLoader
+
+    jinja_env = Environment(
+        loader=FileSystemLoader(template_dir), autoescape=True, auto_reload=False
+    )
+    jinja_env.filters["dt_isoformat"] = dt_isoformat
+    jinja_env.filters["dt_readable_date"] = dt_readable_date
+    return jinja_env.get_template("atom.xml.jinja2")
 
 
 async def digest_feed(feed_url: str, schedule: Schedule):
     """Fetch an RSS/Atom feed and generate a digest feed based on the given schedule."""
-    feed = await _fetch_feed(feed_url)
+    # Feeds with an active WebSub subscription are kept up to date by the hub
+    feed = websub.store.get_feed(feed_url)
+    if feed is None:
+        feed, links = await _fetch_feed(feed_url)
+        websub.subscribe_if_advertised(feed_url, feed, links)
     base_url = _get_base_url(feed_url)
     template_context = _prepare_template_context(schedule, feed, base_url)
-    template = jinja_env.get_template("atom.xml.jinja2")
-    return template.render(**template_context)
+    return _render_feed(template_context)
+
+
+def _render_feed(template_context: TemplateContext) -> str:
+    return _get_template().render(**template_context)
 
 
 def _prepare_template_context(
@@ -103,6 +126,12 @@ def _prepare_template_context(
 
 
 async def _fetch_feed(feed_url):
+    """
+    Fetch and parse a feed. Also return the response's `Link` headers, which
+    may advertise a WebSub hub.
+    """
+    import feedparser  # type: ignore
+
     async with httpx.AsyncClient() as client:
         r = await client.get(feed_url)
         r.raise_for_status()
@@ -111,7 +140,7 @@ async def _fetch_feed(feed_url):
 
     if feed.bozo:  # feedparser sets this flag for malformed feeds
         raise FeedParsingError(f"Invalid or malformed feed: {feed.bozo_exception}")
-    return feed
+    return feed, r.links
 
 
 def _extract_authors(feed) -> set[str]:
@@ -170,6 +199,9 @@ def _extract_entry_data(entry, base_url: str | None) -> EntryData:
 
 
 def _rewrite_relative_urls(html: str, base_url: str) -> str:
+    from bs4 import BeautifulSoup
+    from bs4.element import Tag
+
     soup = BeautifulSoup(html, "html.parser")
     for attr in ["src", "href"]:
         for tag in soup.find_all(attrs={attr: True}):
@@ -1,9 +1,11 @@
 from typing import Annotated
 
 import httpx
-from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 
+from . import websub
 from .digest import FeedParsingError, digest_feed
+from .profiling import ProfilingUnavailableError, authorized, profile_digest
 from .schedule import Schedule
 
 app = FastAPI()
@@ -29,14 +31,58 @@ async def feed_parsing_handler(request: Request, exc: FeedParsingError):
 async def digest(
     schedule_str: Annotated[str, Query(alias="schedule")],
     feed_url: str,
+    profile_token: Annotated[str | None, Header(alias="X-Profile-Token")] = None,
 ):
     """
     Create a digest of RSS feed entries for the specified period.
+
+    With a valid `X-Profile-Token` header, return a profiling report of the
+    request instead.
     """
     try:
         schedule = Schedule.validate(schedule_str)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
+    if profile_token is not None:
+        if not authorized(profile_token):
+            raise HTTPException(status_code=403, detail="Invalid profile token")
+        try:
+            report = await profile_digest(feed_url, schedule)
+        except ProfilingUnavailableError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return Response(content=report, media_type="text/plain")
+
     content = await digest_feed(feed_url, schedule)
     return Response(content=content, media_type="application/xml")
+
+
+@app.get("/websub/{subscription_id}")
+async def websub_verify(
+    subscription_id: str,
+    mode: Annotated[str, Query(alias="hub.mode")],
+    topic: Annotated[str, Query(alias="hub.topic")],
+    challenge: Annotated[str | None, Query(alias="hub.challenge")] = None,
+    lease_seconds: Annotated[int | None, Query(alias="hub.lease_seconds")] = None,
+):
+    """
+    Confirm (or acknowledge the denial of) a WebSub subscription to the hub.
+    """
+    response = websub.verify_intent(
+        subscription_id, mode, topic, challenge, lease_seconds
+    )
+    if response is None:
+        raise HTTPException(status_code=404, detail="Unknown subscription")
+    return Response(content=response, media_type="text/plain")
+
+
+@app.post("/websub/{subscription_id}")
+async def websub_receive(subscription_id: str, request: Request):
+    """
+    Accept new content pushed by a WebSub hub.
+    """
+    body = await request.body()
+    signature = request.headers.get("X-Hub-Signature")
+    if not websub.receive_content(subscription_id, body, signature):
+        raise HTTPException(status_code=410, detail="Unknown subscription")
+    return Response(status_code=202)
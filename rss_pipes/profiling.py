@@ -0,0 +1,126 @@
+"""
+On-demand profiling of a single digest request.
+
+Requests to `/digest` carrying an `X-Profile-Token` header that matches the
+`RSS_PIPES_ADMIN_TOKEN` environment variable are run under cProfile and
+tracemalloc, and return a plain-text report instead of the feed. Other
+requests only pay for the header lookup.
+"""
+
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+from .digest import _get_template, digest_feed
+from .schedule import Schedule
+
+ADMIN_TOKEN_ENV_VAR = "RSS_PIPES_ADMIN_TOKEN"
+
+_STATS_LIMIT = 40
+_ALLOCATIONS_LIMIT = 20
+
+# Stages of `digest_feed` always reported, as (function name, file fragment)
+_STAGES = [
+    ("_fetch_feed", "rss_pipes"),
+    ("parse", "feedparser"),
+    ("_prepare_template_context", "rss_pipes"),
+    ("_render_feed", "rss_pipes"),
+]
+# cProfile can't run twice at once, so profiled requests are serialised
+_lock = asyncio.Lock()
+
+
+class ProfilingUnavailableError(RuntimeError):
+    pass
+
+
+def authorized(token: str) -> bool:
+    admin_token = os.environ.get(ADMIN_TOKEN_ENV_VAR)
+    if not admin_token:
+        return False
+    return hmac.compare_digest(token.encode(), admin_token.encode())
+
+
+async def profile_digest(feed_url: str, schedule: Schedule) -> str:
+    """
+    Run `digest_feed` under cProfile and tracemalloc and return a report.
+
+    Both profilers are process-wide, so anything else the event loop runs in
+    the meantime is included in the report too.
+    """
+    if _lock.locked():
+        raise ProfilingUnavailableError("Another request is being profiled")
+
+    async with _lock:
+        _warm_up()
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await digest_feed(feed_url, schedule)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if not already_tracing:
+                tracemalloc.stop()
+
+    return _format_report(feed_url, elapsed, profiler, peak, snapshot)
+
+
+def _warm_up() -> None:
+    """
+    Pay the one-off cost of the lazy imports and template compilation up
+    front, so it doesn't show up as part of the profiled stages.
+    """
+    import bs4  # noqa: F401
+    import feedparser  # type: ignore # noqa: F401
+    import jinja2  # noqa: F401
+
+    _get_template()
+
+
+def _format_report(
+    feed_url: str,
+    elapsed: float,
+    profiler: cProfile.Profile,
+    peak: int,
+    snapshot: tracemalloc.Snapshot,
+) -> str:
+    out = io.StringIO()
+    out.write(f"Profile of digest for {feed_url}\n")
+    out.write(f"Wall time: {elapsed * 1000:.1f} ms\n")
+    out.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+
+    stats = pstats.Stats(profiler, stream=out)
+    raw_stats = stats.stats  # type: ignore[attr-defined]
+
+    out.write("\n== Pipeline stages (cProfile, cumulative time) ==\n")
+    for name, file_fragment in _STAGES:
+        cumulative = sum(
+            ct
+            for (file, _, function), (_, _, _, ct, _) in raw_stats.items()
+            if function == name and file_fragment in file
+        )
+        out.write(f"{name:<28}{cumulative * 1000:>12.3f} ms\n")
+
+    out.write("\n== CPU time (cProfile, by cumulative time) ==\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_STATS_LIMIT)
+
+    out.write("== Top allocations still held (tracemalloc, by line) ==\n")
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    for stat in snapshot.statistics("lineno")[:_ALLOCATIONS_LIMIT]:
+        out.write(f"{stat}\n")
+
+    return out.getvalue()
@@ -0,0 +1,317 @@
+"""
+WebSub (PubSubHubbub) subscriber.
+
+When a fetched feed advertises a hub, we subscribe to it and let the hub push
+updates to `/websub/{subscription_id}`. While the subscription is active,
+`digest_feed` serves the stored feed instead of polling the publisher.
+
+Subscribing requires a publicly reachable callback, so this is only enabled
+when the `RSS_PIPES_PUBLIC_URL` environment variable is set.
+"""
+
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_URL_ENV_VAR = "RSS_PIPES_PUBLIC_URL"
+
+_SIGNATURE_METHODS = {"sha1", "sha256", "sha384", "sha512"}
+
+# Stored feeds keep at least this many entries, even if they started out smaller
+_MIN_MAX_ENTRIES = 50
+
+# How long to wait for the hub to verify our intent before subscribing again
+_VERIFICATION_TIMEOUT_SECONDS = 10 * 60
+
+# Leases granted by hubs are cut down to this, so that a hub that stops pushing
+# can't keep a feed from being polled for long
+_MAX_LEASE_SECONDS = 3 * 24 * 60 * 60
+
+# Subscriptions (and their stored feeds) kept in memory, least recently used
+# ones are evicted first
+_MAX_SUBSCRIPTIONS = 1000
+
+# References to in-flight subscription requests, so they aren't garbage collected
+_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class Subscription:
+    id: str
+    feed_url: str
+    hub: str
+    topic: str
+    # Only shared with hubs over HTTPS, None otherwise
+    secret: str | None
+    feed: Any
+    max_entries: int
+    pending_until: float
+    expires_at: float | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.expires_at is not None and self.expires_at > time.monotonic()
+
+    @property
+    def pending(self) -> bool:
+        return self.expires_at is None and self.pending_until > time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return not (self.active or self.pending)
+
+
+class WebSubStore:
+    """
+    In-memory subscriptions, along with the latest known content of each feed.
+    Expired subscriptions are dropped, and at most `max_size` are kept.
+    """
+
+    def __init__(self, max_size: int = _MAX_SUBSCRIPTIONS):
+        self.max_size = max_size
+        self.subscriptions: OrderedDict[str, Subscription] = OrderedDict()
+        self.by_feed_url: dict[str, str] = {}
+
+    def get(self, feed_url: str) -> Subscription | None:
+        """Return the live subscription for `feed_url`, if any."""
+        subscription_id = self.by_feed_url.get(feed_url)
+        if subscription_id is None:
+            return None
+        subscription = self.subscriptions[subscription_id]
+        if subscription.expired:
+            self.remove(subscription_id)
+            return None
+        self.subscriptions.move_to_end(subscription_id)
+        return subscription
+
+    def get_feed(self, feed_url: str):
+        """Return the pushed feed for `feed_url` if its subscription is active."""
+        subscription = self.get(feed_url)
+        if subscription is None or not subscription.active:
+            return None
+        return subscription.feed
+
+    def add(self, subscription: Subscription) -> None:
+        previous_id = self.by_feed_url.get(subscription.feed_url)
+        if previous_id is not None:
+            self.subscriptions.pop(previous_id, None)
+        self.subscriptions[subscription.id] = subscription
+        self.by_feed_url[subscription.feed_url] = subscription.id
+        self._evict()
+
+    def _evict(self) -> None:
+        for subscription_id, subscription in list(self.subscriptions.items()):
+            if subscription.expired:
+                self.remove(subscription_id)
+        while len(self.subscriptions) > self.max_size:
+            oldest_id = next(iter(self.subscriptions))
+            self.remove(oldest_id)
+
+    def remove(self, subscription_id: str) -> None:
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if (
+            subscription is not None
+            and self.by_feed_url.get(subscription.feed_url) == subscription_id
+        ):
+            del self.by_feed_url[subscription.feed_url]
+
+    def clear(self) -> None:
+        self.subscriptions.clear()
+        self.by_feed_url.clear()
+
+
+store = WebSubStore()
+
+
+def discover(
+    feed_url: str, feed, links: dict[str | None, dict[str, str]]
+) -> tuple[str, str] | None:
+    """
+    Find the `(hub, topic)` advertised by a feed, preferring HTTP `Link`
+    headers over links in the feed document, as the spec requires. Relative
+    links are resolved against the feed's URL.
+    """
+    hub = links.get("hub", {}).get("url")
+    topic = links.get("self", {}).get("url")
+
+    for link in getattr(feed.feed, "links", []):
+        if hub is None and link.get("rel") == "hub":
+            hub = link.get("href")
+        if topic is None and link.get("rel") == "self":
+            topic = link.get("href")
+
+    if not (hub and topic):
+        return None
+    try:
+        return urljoin(feed_url, hub), urljoin(feed_url, topic)
+    except ValueError as e:
+        logger.warning("Ignoring invalid WebSub links in %s: %s", feed_url, e)
+        return None
+
+
+def subscribe_if_advertised(
+    feed_url: str, feed, links: dict[str | None, dict[str, str]]
+) -> None:
+    """
+    Subscribe to the feed's hub in the background, unless already subscribed,
+    waiting for verification, or disabled.
+    """
+    public_url = os.environ.get(PUBLIC_URL_ENV_VAR)
+    if not public_url:
+        return
+
+    if store.get(feed_url) is not None:
+        # Active, or still waiting for the hub to verify our intent
+        return
+
+    advertised = discover(feed_url, feed, links)
+    if advertised is None:
+        return
+    hub, topic = advertised
+
+    subscription = Subscription(
+        id=secrets.token_urlsafe(16),
+        feed_url=feed_url,
+        hub=hub,
+        topic=topic,
+        secret=secrets.token_hex(32) if urlparse(hub).scheme == "https" else None,
+        feed=feed,
+        max_entries=max(len(feed.entries), _MIN_MAX_ENTRIES),
+        pending_until=time.monotonic() + _VERIFICATION_TIMEOUT_SECONDS,
+    )
+    store.add(subscription)
+
+    callback = f"{public_url.rstrip('/')}/websub/{subscription.id}"
+    task = asyncio.create_task(_request_subscription(subscription, callback))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _request_subscription(subscription: Subscription, callback: str) -> None:
+    data = {
+        "hub.callback": callback,
+        "hub.mode": "subscribe",
+        "hub.topic": subscription.topic,
+    }
+    if subscription.secret is not None:
+        data["hub.secret"] = subscription.secret
+
+    try:
+        async with httpx.AsyncClient() as client:
+            r = await client.post(subscription.hub, data=data)
+            r.raise_for_status()
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        logger.warning(
+            "Subscribing to %s at %s failed: %s",
+            subscription.topic,
+            subscription.hub,
+            e,
+        )
+        store.remove(subscription.id)
+
+
+def verify_intent(
+    subscription_id: str,
+    mode: str,
+    topic: str,
+    challenge: str | None,
+    lease_seconds: int | None,
+) -> str | None:
+    """
+    Handle a hub's verification (or denial) request. Return the challenge to
+    echo back, or None if the request doesn't match a pending subscription.
+    """
+    subscription = store.subscriptions.get(subscription_id)
+    if subscription is None or subscription.topic != topic:
+        return None
+
+    if mode == "denied":
+        logger.warning("Hub %s denied subscription to %s", subscription.hub, topic)
+        store.remove(subscription_id)
+        return ""
+
+    if mode != "subscribe" or challenge is None or not lease_seconds:
+        return None
+
+    lease_seconds = min(lease_seconds, _MAX_LEASE_SECONDS)
+    subscription.expires_at = time.monotonic() + lease_seconds
+    return challenge
+
+
+def receive_content(subscription_id: str, body: bytes, signature: str | None) -> bool:
+    """
+    Merge a content distribution from the hub into the stored feed. Return
+    False if the subscription is unknown. Deliveries with a bad signature are
+    ignored but still acknowledged, as the spec requires. Subscriptions to
+    plain HTTP hubs have no secret, so their deliveries aren't signed.
+    """
+    import feedparser  # type: ignore
+
+    subscription = store.subscriptions.get(subscription_id)
+    if subscription is None:
+        return False
+
+    if subscription.secret is not None and not _valid_signature(
+        subscription.secret, body, signature
+    ):
+        logger.warning(
+            "Ignoring unsigned or mis-signed push for %s", subscription.topic
+        )
+        return True
+
+    pushed = feedparser.parse(body)
+    if pushed.bozo:
+        logger.warning("Ignoring malformed push for %s", subscription.topic)
+        return True
+
+    _merge_feed(subscription, pushed)
+    return True
+
+
+def _valid_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    if not signature or "=" not in signature:
+        return False
+    method, _, digest = signature.partition("=")
+    if method not in _SIGNATURE_METHODS:
+        return False
+    expected = hmac.new(secret.encode(), body, method).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+def _merge_feed(subscription: Subscription, pushed) -> None:
+    feed = subscription.feed
+    feed.feed.update(pushed.feed)
+
+    entries = {_entry_id(entry): entry for entry in feed.entries}
+    for entry in pushed.entries:
+        entry_id = _entry_id(entry)
+        entries.pop(entry_id, None)
+        entries[entry_id] = entry
+
+    # Pushes only carry new or updated entries, so keep the feed from growing
+    # forever by dropping the oldest ones beyond its cap.
+    newest_first = sorted(entries.values(), key=_entry_time, reverse=True)
+    feed.entries = newest_first[: subscription.max_entries]
+
+
+def _entry_id(entry) -> str:
+    return entry.get("id") or entry.get("link") or entry.get("title", "")
+
+
+def _entry_time(entry) -> tuple[bool, tuple[int, ...]]:
+    # Use published date if available, otherwise updated; undated entries last
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if parsed is None:
+        return False, ()
+    return True, tuple(parsed)
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from benchmarks.__main__ import main
+
+
+def test_stages(capsys):
+    # When
+    main(["stages", "--entries", "5", "--repeat", "1", "--json"])
+
+    # Then
+    output = json.loads(capsys.readouterr().out)
+    assert output["spec"]["entries"] == 5
+    assert set(output["report"]) == {
+        "fetch_feed",
+        "apply_schedule",
+        "rewrite_relative_urls",
+        "prepare_template_context",
+        "render",
+        "end_to_end",
+    }
+    assert output["report"]["end_to_end"]["runs"] == 1
+
+
+def test_load(capsys):
+    # When
+    main(["load", "--entries", "5", "--requests", "4", "--concurrency", "2", "--json"])
+
+    # Then
+    report = json.loads(capsys.readouterr().out)["report"]
+    assert set(report) == {"latency", "throughput"}
+    assert report["latency"]["runs"] == 4
+    assert report["throughput"]["errors"] == 0
+
+
+@pytest.mark.parametrize("option", ["--repeat", "--requests", "--concurrency"])
+def test_non_positive_counts_are_rejected(option):
+    with pytest.raises(SystemExit):
+        main(["stages", option, "0"])
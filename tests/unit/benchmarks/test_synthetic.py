@@ -0,0 +1,26 @@
+import pytest
+
+from benchmarks.synthetic import FeedSpec, generate_feed
+from rss_pipes.digest import digest_feed
+from rss_pipes.schedule import Schedule
+
+
+def test_generate_feed_is_deterministic():
+    spec = FeedSpec(entries=10, content_length=200, seed=42)
+    assert generate_feed(spec) == generate_feed(spec)
+
+
+@pytest.mark.asyncio
+async def test_generated_feed_can_be_digested(httpx_mock):
+    # Given
+    spec = FeedSpec(entries=20, content_length=500, relative_url_density=1.0)
+    feed_url = "http://example.org/atom.xml"
+    httpx_mock.add_response(url=feed_url, text=generate_feed(spec))
+    schedule = Schedule.validate("daily-9:00")
+
+    # When
+    result = await digest_feed(feed_url, schedule)
+
+    # Then
+    assert "Entry 19" in result
+    assert "http://example.org/assets/" in result
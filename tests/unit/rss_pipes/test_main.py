@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from datetime import time
 from unittest.mock import patch
 
@@ -45,3 +47,21 @@ def test_digest_invalid_schedule(client):
 
     # Then
     assert response.status_code == 422
+
+
+def test_import_does_not_load_heavy_modules():
+    # When
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, rss_pipes.main; "
+            "print(sorted({'bs4', 'feedparser', 'jinja2'} & set(sys.modules)))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    # Then
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,114 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from rss_pipes import profiling
+from rss_pipes.main import app
+from rss_pipes.profiling import ADMIN_TOKEN_ENV_VAR, profile_digest
+from rss_pipes.schedule import Schedule
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture()
+def profile_digest_mock():
+    with patch("rss_pipes.main.profile_digest") as mock:
+        mock.return_value = "FAKE REPORT"
+        yield mock
+
+
+@pytest.mark.asyncio
+async def test_profile_digest(httpx_mock):
+    # Given
+    with open(FIXTURES_DIR / "atom.xml") as f:
+        input_feed = f.read()
+
+    feed_url = "http://example.org/atom.xml"
+    httpx_mock.add_response(url=feed_url, text=input_feed)
+    schedule = Schedule.validate("weekly-sat-10:00")
+
+    # When
+    report = await profile_digest(feed_url, schedule)
+
+    # Then
+    assert "Peak traced memory" in report
+    stages = _parse_stages(report)
+    assert set(stages) == {
+        "_fetch_feed",
+        "parse",
+        "_prepare_template_context",
+        "_render_feed",
+    }
+    for stage, milliseconds in stages.items():
+        assert milliseconds > 0, stage
+
+
+def _parse_stages(report: str) -> dict[str, float]:
+    block = report.split("== Pipeline stages")[1].split("\n\n")[0]
+    stages = {}
+    for line in block.splitlines()[1:]:
+        name, milliseconds, _ = line.split()
+        stages[name] = float(milliseconds)
+    return stages
+
+
+def test_digest_profiled(client, profile_digest_mock, monkeypatch):
+    # Given
+    monkeypatch.setenv(ADMIN_TOKEN_ENV_VAR, "secret")
+
+    # When
+    response = client.get(
+        "/digest/https://example.org/atom.xml",
+        params={"schedule": "daily-9:00"},
+        headers={"X-Profile-Token": "secret"},
+    )
+
+    # Then
+    assert response.status_code == 200
+    assert response.text == "FAKE REPORT"
+
+
+@pytest.mark.parametrize("admin_token", [None, "secret"])
+def test_digest_profiled_unauthorized(
+    client, profile_digest_mock, monkeypatch, admin_token
+):
+    # Given
+    if admin_token is None:
+        monkeypatch.delenv(ADMIN_TOKEN_ENV_VAR, raising=False)
+    else:
+        monkeypatch.setenv(ADMIN_TOKEN_ENV_VAR, admin_token)
+
+    # When
+    response = client.get(
+        "/digest/https://example.org/atom.xml",
+        params={"schedule": "daily-9:00"},
+        headers={"X-Profile-Token": "wrong"},
+    )
+
+    # Then
+    assert response.status_code == 403
+    profile_digest_mock.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_digest_profiled_concurrently(client, monkeypatch):
+    # Given
+    monkeypatch.setenv(ADMIN_TOKEN_ENV_VAR, "secret")
+
+    # When
+    async with profiling._lock:
+        response = client.get(
+            "/digest/https://example.org/atom.xml",
+            params={"schedule": "daily-9:00"},
+            headers={"X-Profile-Token": "secret"},
+        )
+
+    # Then
+    assert response.status_code == 409
@@ -0,0 +1,456 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+
+from rss_pipes import websub
+from rss_pipes.digest import digest_feed
+from rss_pipes.main import app
+from rss_pipes.schedule import Schedule
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+FEED_URL = "http://example.org/atom.xml"
+HUB_URL = "https://hub.example.org/"
+SCHEDULE = Schedule.validate("daily-9:00")
+
+FEED_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Test Feed</title>
+  <link rel="self" href="{self_href}"/>
+  <link rel="hub" href="{hub_href}"/>
+  <id>urn:uuid:60a76c80-d399-11d9-b93C-0003939e0af6</id>
+</feed>
+"""
+
+# The hub and the publisher are stubbed, requests to the app itself are not
+pytestmark = pytest.mark.httpx_mock(
+    should_mock=lambda request: request.url.host != "testserver"
+)
+
+
+@pytest.fixture(autouse=True)
+def websub_enabled(monkeypatch):
+    monkeypatch.setenv(websub.PUBLIC_URL_ENV_VAR, "http://rss-pipes.example.org")
+    yield
+    websub.store.clear()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest_asyncio.fixture
+async def subscription(httpx_mock):
+    with open(FIXTURES_DIR / "websub_atom.xml") as f:
+        httpx_mock.add_response(url=FEED_URL, text=f.read())
+    httpx_mock.add_response(url=HUB_URL, method="POST", status_code=202)
+
+    await _digest_and_subscribe()
+
+    [subscription] = websub.store.subscriptions.values()
+    return subscription
+
+
+async def _digest_and_subscribe():
+    result = await digest_feed(FEED_URL, SCHEDULE)
+    # Subscription requests are sent in the background
+    await asyncio.gather(*websub._tasks)
+    return result
+
+
+def _verify(client, subscription, challenge="abc123"):
+    return client.get(
+        f"/websub/{subscription.id}",
+        params={
+            "hub.mode": "subscribe",
+            "hub.topic": subscription.topic,
+            "hub.challenge": challenge,
+            "hub.lease_seconds": 3600,
+        },
+    )
+
+
+def _push(client, subscription, body: bytes, secret: str | None = None):
+    digest = hmac.new(
+        (secret or subscription.secret).encode(), body, hashlib.sha256
+    ).hexdigest()
+    return client.post(
+        f"/websub/{subscription.id}",
+        content=body,
+        headers={"X-Hub-Signature": f"sha256={digest}"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_subscribes_to_advertised_hub(httpx_mock, subscription):
+    # Then
+    hub_request = httpx_mock.get_request(url=HUB_URL)
+    form = parse_qs(hub_request.content.decode())
+    assert form["hub.mode"] == ["subscribe"]
+    assert form["hub.topic"] == [FEED_URL]
+    assert form["hub.callback"] == [
+        f"http://rss-pipes.example.org/websub/{subscription.id}"
+    ]
+    assert form["hub.secret"] == [subscription.secret]
+
+
+@pytest.mark.asyncio
+async def test_no_subscription_without_public_url(httpx_mock, monkeypatch):
+    # Given
+    monkeypatch.delenv(websub.PUBLIC_URL_ENV_VAR)
+    with open(FIXTURES_DIR / "websub_atom.xml") as f:
+        httpx_mock.add_response(url=FEED_URL, text=f.read())
+
+    # When
+    await digest_feed(FEED_URL, SCHEDULE)
+
+    # Then
+    assert not websub.store.subscriptions
+
+
+@pytest.mark.asyncio
+async def test_verified_subscription_is_not_polled(client, subscription):
+    # When
+    response = _verify(client, subscription)
+
+    # Then
+    assert response.status_code == 200
+    assert response.text == "abc123"
+    # No further response is registered for the feed, so polling would fail
+    result = await digest_feed(FEED_URL, SCHEDULE)
+    assert "March 1, Item 1" in result
+
+
+@pytest.mark.asyncio
+async def test_unverified_subscription_is_still_polled(httpx_mock, subscription):
+    # Given
+    with open(FIXTURES_DIR / "websub_atom.xml") as f:
+        httpx_mock.add_response(url=FEED_URL, text=f.read())
+
+    # When
+    await digest_feed(FEED_URL, SCHEDULE)
+
+    # Then
+    assert len(httpx_mock.get_requests(url=FEED_URL)) == 2
+
+
+def test_verify_unknown_subscription(client):
+    # When
+    response = client.get(
+        "/websub/unknown",
+        params={
+            "hub.mode": "subscribe",
+            "hub.topic": FEED_URL,
+            "hub.challenge": "abc123",
+            "hub.lease_seconds": 3600,
+        },
+    )
+
+    # Then
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_denied_subscription_is_removed(client, subscription):
+    # When
+    response = client.get(
+        f"/websub/{subscription.id}",
+        params={"hub.mode": "denied", "hub.topic": subscription.topic},
+    )
+
+    # Then
+    assert response.status_code == 200
+    assert not websub.store.subscriptions
+
+
+@pytest.mark.asyncio
+async def test_push_updates_stored_feed(client, subscription):
+    # Given
+    _verify(client, subscription)
+    with open(FIXTURES_DIR / "websub_push.xml", "rb") as f:
+        body = f.read()
+
+    # When
+    response = _push(client, subscription, body)
+
+    # Then
+    assert response.status_code == 202
+    result = await digest_feed(FEED_URL, SCHEDULE)
+    assert "March 2, Item 1 - Pushed" in result
+    assert "March 1, Item 1" in result
+
+
+@pytest.mark.asyncio
+async def test_push_beyond_cap_drops_oldest_entries(client, subscription):
+    # Given
+    subscription.max_entries = 3
+    _verify(client, subscription)
+    with open(FIXTURES_DIR / "websub_push.xml", "rb") as f:
+        body = f.read()
+
+    # When
+    _push(client, subscription, body)
+
+    # Then
+    titles = [entry.title for entry in subscription.feed.entries]
+    assert titles == [
+        "March 2, Item 1 - Pushed",
+        "March 1, Item 3",
+        "March 1, Item 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_empty_feed_is_still_capped(httpx_mock):
+    # Given
+    text = FEED_TEMPLATE.format(self_href=FEED_URL, hub_href=HUB_URL)
+    httpx_mock.add_response(url=FEED_URL, text=text)
+    httpx_mock.add_response(url=HUB_URL, method="POST", status_code=202)
+
+    # When
+    await _digest_and_subscribe()
+
+    # Then
+    [subscription] = websub.store.subscriptions.values()
+    assert subscription.max_entries > 0
+
+
+@pytest.mark.asyncio
+async def test_relative_hub_links_are_resolved(httpx_mock):
+    # Given
+    text = FEED_TEMPLATE.format(self_href="/atom.xml", hub_href="/hub")
+    httpx_mock.add_response(url=FEED_URL, text=text)
+    httpx_mock.add_response(
+        url="http://example.org/hub", method="POST", status_code=202
+    )
+
+    # When
+    await _digest_and_subscribe()
+
+    # Then
+    [subscription] = websub.store.subscriptions.values()
+    assert subscription.hub == "http://example.org/hub"
+    assert subscription.topic == FEED_URL
+
+
+@pytest.mark.asyncio
+async def test_malformed_hub_link_is_ignored(httpx_mock):
+    # Given
+    text = FEED_TEMPLATE.format(self_href=FEED_URL, hub_href="http://[::1")
+    httpx_mock.add_response(url=FEED_URL, text=text)
+
+    # When
+    result = await _digest_and_subscribe()
+
+    # Then
+    assert "Test Feed" in result
+    assert not websub.store.subscriptions
+
+
+@pytest.mark.asyncio
+async def test_invalid_hub_url_is_ignored(httpx_mock):
+    # Given
+    text = FEED_TEMPLATE.format(self_href=FEED_URL, hub_href=HUB_URL)
+    httpx_mock.add_response(url=FEED_URL, text=text)
+    httpx_mock.add_exception(httpx.InvalidURL("Invalid URL"), url=HUB_URL)
+
+    # When
+    result = await _digest_and_subscribe()
+
+    # Then
+    assert "Test Feed" in result
+    assert not websub.store.subscriptions
+
+
+@pytest.mark.asyncio
+async def test_failed_subscription_is_retried(httpx_mock):
+    # Given
+    with open(FIXTURES_DIR / "websub_atom.xml") as f:
+        text = f.read()
+    httpx_mock.add_response(url=FEED_URL, text=text, is_reusable=True)
+    httpx_mock.add_response(url=HUB_URL, method="POST", status_code=500)
+    await _digest_and_subscribe()
+    httpx_mock.add_response(url=HUB_URL, method="POST", status_code=202)
+
+    # When
+    await _digest_and_subscribe()
+
+    # Then
+    assert len(httpx_mock.get_requests(url=HUB_URL)) == 2
+    assert len(websub.store.subscriptions) == 1
+
+
+@pytest.mark.asyncio
+async def test_unverified_subscription_is_retried_after_timeout(
+    httpx_mock, subscription
+):
+    # Given
+    subscription.pending_until = time.monotonic() - 1
+    with open(FIXTURES_DIR / "websub_atom.xml") as f:
+        httpx_mock.add_response(url=FEED_URL, text=f.read())
+    httpx_mock.add_response(url=HUB_URL, method="POST", status_code=202)
+
+    # When
+    await _digest_and_subscribe()
+
+    # Then
+    assert len(httpx_mock.get_requests(url=HUB_URL)) == 2
+    [resubscription] = websub.store.subscriptions.values()
+    assert resubscription.id != subscription.id
+
+
+@pytest.mark.asyncio
+async def test_push_with_bad_signature_is_ignored(client, subscription):
+    # Given
+    _verify(client, subscription)
+    with open(FIXTURES_DIR / "websub_push.xml", "rb") as f:
+        body = f.read()
+
+    # When
+    response = _push(client, subscription, body, secret="wrong")
+
+    # Then
+    assert response.status_code == 202
+    result = await digest_feed(FEED_URL, SCHEDULE)
+    assert "Pushed" not in result
+
+
+def test_push_to_unknown_subscription(client):
+    # When
+    response = client.post("/websub/unknown", content=b"<feed/>")
+
+    # Then
+    assert response.status_code == 410
+
+
+@pytest.mark.asyncio
+async def test_link_headers_are_preferred(httpx_mock):
+    # Given
+    header_hub = "https://header-hub.example.org/"
+    text = FEED_TEMPLATE.format(self_href=FEED_URL, hub_href=HUB_URL)
+    httpx_mock.add_response(
+        url=FEED_URL,
+        text=text,
+        headers={"Link": f'<{header_hub}>; rel="hub", <{FEED_URL}>; rel="self"'},
+    )
+    httpx_mock.add_response(url=header_hub, method="POST", status_code=202)
+
+    # When
+    await _digest_and_subscribe()
+
+    # Then
+    [subscription] = websub.store.subscriptions.values()
+    assert subscription.hub == header_hub
+    assert subscription.topic == FEED_URL
+
+
+@pytest.mark.asyncio
+async def test_plain_http_hub_gets_no_secret(client, httpx_mock):
+    # Given
+    hub_url = "http://hub.example.org/"
+    text = FEED_TEMPLATE.format(self_href=FEED_URL, hub_href=hub_url)
+    httpx_mock.add_response(url=FEED_URL, text=text)
+    httpx_mock.add_response(url=hub_url, method="POST", status_code=202)
+
+    # When
+    await _digest_and_subscribe()
+
+    # Then
+    form = parse_qs(httpx_mock.get_request(url=hub_url).content.decode())
+    assert "hub.secret" not in form
+    [subscription] = websub.store.subscriptions.values()
+    assert subscription.secret is None
+
+    # And unsigned pushes are accepted
+    _verify(client, subscription)
+    with open(FIXTURES_DIR / "websub_push.xml", "rb") as f:
+        response = client.post(f"/websub/{subscription.id}", content=f.read())
+    assert response.status_code == 202
+    result = await digest_feed(FEED_URL, SCHEDULE)
+    assert "March 2, Item 1 - Pushed" in result
+
+
+@pytest.mark.asyncio
+async def test_lease_is_capped(client, subscription):
+    # When
+    client.get(
+        f"/websub/{subscription.id}",
+        params={
+            "hub.mode": "subscribe",
+            "hub.topic": subscription.topic,
+            "hub.challenge": "abc123",
+            "hub.lease_seconds": 10 * 365 * 24 * 60 * 60,
+        },
+    )
+
+    # Then
+    assert subscription.expires_at <= time.monotonic() + websub._MAX_LEASE_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_verify_without_lease_is_rejected(client, subscription):
+    # When
+    response = client.get(
+        f"/websub/{subscription.id}",
+        params={
+            "hub.mode": "subscribe",
+            "hub.topic": subscription.topic,
+            "hub.challenge": "abc123",
+        },
+    )
+
+    # Then
+    assert response.status_code == 404
+    assert subscription.expires_at is None
+
+
+@pytest.mark.asyncio
+async def test_expired_subscription_is_removed(client, subscription):
+    # Given
+    _verify(client, subscription)
+    subscription.expires_at = time.monotonic() - 1
+
+    # When
+    feed = websub.store.get_feed(FEED_URL)
+
+    # Then
+    assert feed is None
+    assert not websub.store.subscriptions
+    assert not websub.store.by_feed_url
+
+
+def test_least_recently_used_subscriptions_are_evicted():
+    # Given
+    store = websub.WebSubStore(max_size=2)
+
+    def add(feed_url):
+        subscription = websub.Subscription(
+            id=feed_url,
+            feed_url=feed_url,
+            hub=HUB_URL,
+            topic=feed_url,
+            secret=None,
+            feed=None,
+            max_entries=1,
+            pending_until=time.monotonic() + 60,
+        )
+        store.add(subscription)
+
+    add("http://example.org/1")
+    add("http://example.org/2")
+    store.get("http://example.org/1")
+
+    # When
+    add("http://example.org/3")
+
+    # Then
+    assert list(store.by_feed_url) == ["http://example.org/1", "http://example.org/3"]